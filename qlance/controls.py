@@ -3,7 +3,7 @@ Control system calculations
 """
 
 import numpy as np
-from numpy.linalg import inv
+from numpy.linalg import inv, solve
 import pandas as pd
 from collections import OrderedDict
 from .utils import (assertType, siPrefix, append_str_if_unique,
@@ -11,11 +11,38 @@ from .utils import (assertType, siPrefix, append_str_if_unique,
 from . import io
 from functools import partial
 from numbers import Number
-from itertools import cycle, zip_longest
 import scipy.signal as sig
 import matplotlib.pyplot as plt
 from . import plotting
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# minimum number of frequency points for which zpk uses the compiled kernel
+ZPK_NUMBA_MIN_PTS = 100
+
+# test points around the main loop in cyclic order
+_LOOP_TSTPNTS = ['err', 'sens', 'drive', 'act', 'ctrl']
+
+
+def _loop_path(tp_to, tp_from):
+    """List the test points whose matrices are multiplied, in order, when
+    going around the main loop from one test point to another
+    """
+    nTstpnts = len(_LOOP_TSTPNTS)
+    start = _LOOP_TSTPNTS.index(tp_to)
+    nSteps = (_LOOP_TSTPNTS.index(tp_from) - start) % nTstpnts
+    return tuple(_LOOP_TSTPNTS[(start + step) % nTstpnts]
+                 for step in range(nSteps))
+
+
+# paths around the main loop between every pair of different test points
+_LOOP_PATHS = {(tp_to, tp_from): _loop_path(tp_to, tp_from)
+               for tp_to in _LOOP_TSTPNTS for tp_from in _LOOP_TSTPNTS
+               if tp_to != tp_from}
+
 
 def assertArr(arr):
     """Ensure that the input is an array
@@ -32,22 +59,81 @@ def assertArr(arr):
 
 def multiplyMat(mat1, mat2):
     """Multiply two matrices
+
+    Matrices with three dimensions have the frequency as their first index
+    so that the product is a batched matrix multiplication over frequency.
+    Two dimensional matrices are broadcast across all frequencies.
     """
     if np.isscalar(mat1) or np.isscalar(mat2):
         return mat1*mat2
 
-    dim1 = len(mat1.shape)
-    dim2 = len(mat2.shape)
-    str1 = ''.join(['i', 'j', 'f'][:dim1])
-    str2 = ''.join(['j', 'k', 'f'][:dim2])
-    str3 = ''.join(['i', 'k', 'f'][:max(dim1, dim2)])
-    cmd = '{:s},{:s}->{:s}'.format(str1, str2, str3)
-    return np.einsum(cmd, mat1, mat2)
+    return np.matmul(mat1, mat2)
+
+
+def multiplyDiag(mat, diag):
+    """Multiply a matrix by a diagonal matrix on the right
+
+    Inputs:
+      mat: the matrix (nFreq, n, m) or a scalar
+      diag: the diagonal (nFreq, m) of the diagonal matrix
+
+    Returns:
+      the (nFreq, n, m) product
+    """
+    if np.isscalar(mat):
+        return mat * diag[..., np.newaxis] * np.eye(diag.shape[-1])
+
+    return mat * diag[..., np.newaxis, :]
+
+
+def freq_last(mat):
+    """Move the frequency index of a matrix from the first to the last index
+
+    Internally, matrices are stored as (nFreq, n, m) arrays but transfer
+    functions are returned as (n, m, nFreq) arrays. Scalars and two
+    dimensional matrices are returned unchanged.
+    """
+    if np.ndim(mat) == 3:
+        return np.moveaxis(mat, 0, -1)
+    else:
+        return mat
+
+
+def _abs2(z):
+    """Compute the magnitude squared of a complex array
+
+    Equivalent to np.abs(z)**2 without taking a square root and then
+    squaring it.
+    """
+    return z.real**2 + z.imag**2
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _zpk_numba(zs, ps, k, ss, out):
+        """Compiled kernel for zpk
+
+        Evaluates each frequency in a single pass over the zeros and poles
+        without allocating any temporary arrays.
+        """
+        nzs = zs.size
+        nps = ps.size
+        for si in range(ss.size):
+            acc = k
+            for ind in range(max(nzs, nps)):
+                if ind < nzs:
+                    acc *= ss[si] - zs[ind]
+                if ind < nps:
+                    acc /= ss[si] - ps[ind]
+            out[si] = acc
 
 
 def zpk(zs, ps, k, ss):
     """Return the function specified by zeros, poles, and a gain
 
+    If numba is installed, long frequency vectors are computed with a
+    compiled kernel.
+
     Inputs:
       zs: the zeros
       ps: the poles
@@ -60,26 +146,42 @@ def zpk(zs, ps, k, ss):
     if not isinstance(k, Number):
         raise ValueError('The gain should be a scalar')
 
-    if isinstance(ss, Number):
-        filt = k
-    else:
-        filt = k * np.ones(len(ss), dtype=complex)
+    return _zpk_prepared(_prepare_zp(zs), _prepare_zp(ps), k, ss)
+
+
+def _prepare_zp(zp):
+    """Convert zeros or poles into a contiguous complex array
+    """
+    return np.ascontiguousarray(assertArr(zp), dtype=complex)
+
 
-    # for z in assertArr(zs):
-    #     filt *= (ss - z)
+def _zpk_prepared(zs, ps, k, ss):
+    """Evaluate zpk for zeros and poles that are contiguous complex arrays
 
-    # for p in assertArr(ps):
-    #     filt /= (ss - p)
+    Filters defined with zeros and poles convert them once when they are
+    defined and then only call this. See zpk for the inputs.
+    """
+    if (njit is not None and isinstance(ss, np.ndarray) and ss.ndim == 1
+            and len(ss) >= ZPK_NUMBA_MIN_PTS):
+        filt = np.empty(len(ss), dtype=complex)
+        _zpk_numba(
+            zs, ps, complex(k), np.ascontiguousarray(ss, dtype=complex), filt)
+        return filt
+
+    npairs = min(len(zs), len(ps))
+
+    # broadcast the frequencies against the zeros and poles so that all of
+    # them are applied at once instead of looping over each one
+    ss = np.asarray(ss)[..., np.newaxis]
 
     # Do this with pole/zero pairs instead of all the zeros and then all the
     # poles to avoid numerical issues when dividing huge numerators by huge
     # denominators for filters with many poles and zeros
-    for z, p in zip_longest(assertArr(zs), assertArr(ps)):
-        if z is not None:
-            filt *= (ss - z)
+    filt = k * np.prod((ss - zs[:npairs]) / (ss - ps[:npairs]), axis=-1)
 
-        if p is not None:
-            filt /= (ss - p)
+    # apply whichever zeros or poles are left over
+    filt *= np.prod(ss - zs[npairs:], axis=-1)
+    filt /= np.prod(ss - ps[npairs:], axis=-1)
 
     return filt
 
@@ -153,34 +255,37 @@ def catfilt(*args):
     Returns:
       newFilt: a Filter instance which is the product of the inputs
     """
-    # check if any of the filters have not been defined with zpk
-    zpk_defined = True
-    for filt in args:
-        if filt._ps is None:
-            zpk_defined = False
-            break
-
-    # if all filters have zpk, define a new one combining this information
-    if zpk_defined:
-        zs = []
-        ps = []
-        k = 1
-        for filt in args:
-            zf, pf, kf = filt.get_zpk(Hz=False)
-            zs.extend(assertArr(zf))
-            ps.extend(assertArr(pf))
-            k *= kf
-        return Filter(zs, ps, k, Hz=False)
-
-    # otherwise just make a new function
-    else:
-        def newFilt(ss):
-            out = 1
-            for filt in args:
-                out *= filt._filt(ss)
-            return out
-
-        return Filter(newFilt)
+    # separate the filters defined with zpk from those defined by functions
+    zpk_filts = [filt for filt in args if filt._ps is not None]
+    func_filts = [filt for filt in args if filt._ps is None]
+
+    # combine all of the zpk information into a single filter so that the
+    # product is evaluated in one pass over the frequencies
+    zs = []
+    ps = []
+    k = 1
+    for filt in zpk_filts:
+        zf, pf, kf = filt.get_zpk(Hz=False)
+        zs.extend(assertArr(zf))
+        ps.extend(assertArr(pf))
+        k *= kf
+    zpk_filt = Filter(zs, ps, k, Hz=False)
+
+    # if all filters have zpk (or there are no filters), this is the new filter
+    if not func_filts:
+        return zpk_filt
+
+    if zpk_filts:
+        func_filts.insert(0, zpk_filt)
+
+    # otherwise make a new function multiplying the remaining filters
+    def newFilt(ss):
+        out = 1
+        for filt in func_filts:
+            out *= filt._filt(ss)
+        return out
+
+    return Filter(newFilt)
 
 
 def compute_phase_margin(ff, tf):
@@ -393,10 +498,7 @@ class Filter:
                 zs = a*np.array(args[0]['zs'])
                 ps = a*np.array(args[0]['ps'])
                 k = args[0]['k']
-                self._filt = partial(zpk, zs, ps, k)
-                self._zs = zs
-                self._ps = ps
-                self._k = k
+                self._update_zpk(zs, ps, k)
 
             elif callable(args[0]):
                 self._filt = args[0]
@@ -412,13 +514,7 @@ class Filter:
             zs = a*np.array(args[0])
             ps = a*np.array(args[1])
             k = args[2]
-            if not isinstance(k, Number):
-                raise ValueError('The gain should be a scalar')
-
-            self._filt = partial(zpk, zs, ps, k)
-            self._zs = zs
-            self._ps = ps
-            self._k = k
+            self._update_zpk(zs, ps, k)
 
         elif len(args) == 4:
             zs = a*np.array(args[0])
@@ -430,10 +526,7 @@ class Filter:
                     'The gain and reference frequency should be scalars')
 
             k = g / np.abs(zpk(zs, ps, 1, s0))
-            self._filt = partial(zpk, zs, ps, k)
-            self._zs = zs
-            self._ps = ps
-            self._k = k
+            self._update_zpk(zs, ps, k)
 
         else:
             msg = 'Incorrect number of arguments. Input can be either\n' \
@@ -444,6 +537,26 @@ class Filter:
                   + ' and gain at a specific frequency'
             raise ValueError(msg)
 
+    def _update_zpk(self, zs, ps, k):
+        """Set the zeros, poles, and gain of this filter
+
+        The zeros and poles are converted to complex arrays here once so
+        that evaluating the filter doesn't need to do so every time.
+
+        Inputs:
+          zs: the zeros in the s-domain [rad/s]
+          ps: the poles in the s-domain [rad/s]
+          k: the gain
+        """
+        if not isinstance(k, Number):
+            raise ValueError('The gain should be a scalar')
+
+        self._zs = zs
+        self._ps = ps
+        self._k = k
+        self._filt = partial(
+            _zpk_prepared, _prepare_zp(zs), _prepare_zp(ps), k)
+
     def computeFilter(self, ff):
         """Compute the filter
 
@@ -528,22 +641,28 @@ class ControlSystem:
     def __init__(self):
         self._plant_model = None
         self._dofs = OrderedDict()
-        self._filters = []
+        self._filters = OrderedDict()
         self._probes = []
         self._drives = []
-        self._actFilts = []
-        self._compFilts = []
+        self._actFilts = OrderedDict()
+        self._compFilts = OrderedDict()
         self._plant = None
         self._ctrlMat = None
         self._oltf = None
-        self._cltf = None
         self._inMat = None
         self._outMat = None
-        self._compMat = None
-        self._actMat = None
+        self._compDiag = None
+        self._actDiag = None
         self._mMech = None
         self._drive2bsm = None
         self._outComp = None
+        self._dof_index = {}
+        self._probe_index = {}
+        self._drive_index = {}
+        self._drive_split = []
+        self._tf_cache = {}
+        self._ss = None
+        self._filt_cache = {}
 
     @property
     def plant_model(self):
@@ -604,19 +723,26 @@ class ControlSystem:
         Note: The spot test point cannot be used if drive2bsm is False
         and the pos test point cannot be used if mechmod is False
         """
+        self._updateIndices()
+        self._tf_cache = {}
+        self._ss = self.ss
+        self._filt_cache = {}
         self._inMat = self._computeInputMatrix()
         self._outMat = self._computeOutputMatrix()
         self._plant = self._computePlant()
         self._ctrlMat = self._computeController()
-        self._compMat = self._computeCompensator()
-        self._actMat = self._computeResponse()
+        self._compDiag = self._computeCompensator()
+        self._actDiag = self._computeResponse()
         if mechmod:
             self._mMech = self._computeMechMod()
-        self._outComp = np.einsum('ijf,jk->ikf', self._compMat, self._outMat)
+        if self._compDiag is None:
+            # no compensation so only add the frequency dimension
+            self._outComp = np.broadcast_to(
+                self._outMat, (len(self._ss),) + self._outMat.shape)
+        else:
+            self._outComp = self._compDiag[..., np.newaxis] * self._outMat
         self._oltf = {tp: self._computeOLTF(tp)
                      for tp in ['err', 'ctrl', 'act', 'drive', 'sens']}
-        self._cltf = {sig: self._computeCLTF(oltf)
-                     for sig, oltf in self._oltf.items()}
         if drive2bsm:
             self._computeBeamSpotMotion()
 
@@ -679,26 +805,57 @@ class ControlSystem:
         self.dofs[name] = dof
         append_str_if_unique(self.probes, dof.probes)
         append_str_if_unique(self.drives, dof.drives)
+        self._updateIndices()
+
+    def _updateIndices(self):
+        """Update the dictionaries of DOF, probe, and drive indices
+
+        Also splits the drives into their names and doftypes so that this
+        does not need to be done for every element of the matrices.
+        """
+        self._dof_index = {name: ind for ind, name in enumerate(self.dofs)}
+        self._probe_index = {
+            probe: ind for ind, probe in enumerate(self.probes)}
+        self._drive_index = {
+            drive: ind for ind, drive in enumerate(self.drives)}
+        self._drive_split = []
+        for drive in self.drives:
+            driveData = drive.split('.')
+            self._drive_split.append((driveData[0], driveData[-1]))
 
     def _computePlant(self):
         """Compute the qlance plant from drives to probes
 
         Returns:
-          plant: The plant a (nProbes, nDrives, nFreq) array
+          plant: The plant a (nFreq, nProbes, nDrives) array
             with the transfer functions from drives to probes
         """
         nProbes = len(self.probes)
         nDrives = len(self.drives)
         nff = len(self.ff)
-        plant = np.zeros((nProbes, nDrives, nff), dtype=complex)
-
-        for pi, probe in enumerate(self.probes):
-            for di, drive in enumerate(self.drives):
-                driveData = drive.split('.')
-                driveName = driveData[0]
-                doftype = driveData[-1]
-                tf = self.plant_model.getTF(probe, driveName, doftype=doftype)
-                plant[pi, di, :] = tf
+        plant = np.zeros((nff, nProbes, nDrives), dtype=complex)
+
+        # fall back to computing each TF separately if the model can't
+        # compute the whole matrix at once
+        if not hasattr(self.plant_model, 'getTFMatrix'):
+            for pi, probe in enumerate(self.probes):
+                for di, (driveName, doftype) in enumerate(self._drive_split):
+                    tf = self.plant_model.getTF(
+                        probe, driveName, doftype=doftype)
+                    plant[:, pi, di] = tf
+            return plant
+
+        # group the drives by doftype and compute each group at once
+        groups = OrderedDict()
+        for di, (driveName, doftype) in enumerate(self._drive_split):
+            inds, names = groups.setdefault(doftype, ([], []))
+            inds.append(di)
+            names.append(driveName)
+
+        for doftype, (inds, names) in groups.items():
+            tfs = self.plant_model.getTFMatrix(
+                self.probes, names, doftype=doftype)
+            plant[:, :, inds] = np.moveaxis(tfs, -1, 0)
         return plant
 
     def _computeInputMatrix(self):
@@ -707,11 +864,16 @@ class ControlSystem:
         Returns:
           sensMat: a (nDOF, nProbes) array
         """
-        nProbes = len(self.probes)
-        nDOF = len(self.dofs)
-        sensMat = np.zeros((nDOF, nProbes))
+        rows = []
+        cols = []
+        vals = []
         for di, dof in enumerate(self.dofs.values()):
-            sensMat[di, :] = dof.probes2dof(self.probes)
+            for probe, coeff in dof.probes.items():
+                rows.append(di)
+                cols.append(self._probe_index[probe])
+                vals.append(coeff)
+        sensMat = np.zeros((len(self.dofs), len(self.probes)))
+        sensMat[rows, cols] = vals
         return sensMat
 
     def _computeOutputMatrix(self):
@@ -720,89 +882,119 @@ class ControlSystem:
         Returns:
           actMat: a (nDrives, nDOF) array
         """
-        nDOF = len(self.dofs)
-        nDrives = len(self.drives)
-        actMat = np.zeros((nDrives, nDOF))
+        rows = []
+        cols = []
+        vals = []
         for di, dof in enumerate(self.dofs.values()):
-            actMat[:, di] = dof.dofs2drives(self.drives)
+            for drive, coeff in dof.drives.items():
+                rows.append(self._drive_index[drive])
+                cols.append(di)
+                vals.append(coeff)
+        actMat = np.zeros((len(self.drives), len(self.dofs)))
+        actMat[rows, cols] = vals
         return actMat
 
     def _computeController(self):
         """Compute the control matrix from DOFs to DOFs
 
         Returns:
-          ctrlMat: a (nDOF, nDOF, nff) array
+          ctrlMat: a (nff, nDOF, nDOF) array
         """
-        if self.ss is None:
+        if self._ss is None:
             raise RuntimeError('There is no associated qlance model')
         nDOF = len(self.dofs)
-        ctrlMat = np.zeros((nDOF, nDOF, len(self.ss)), dtype=complex)
-        for (dof_to, dof_from, filt) in self._filters:
-            toInd = list(self.dofs.keys()).index(dof_to)
-            fromInd = list(self.dofs.keys()).index(dof_from)
-            ctrlMat[toInd, fromInd, :] = filt._filt(self.ss)
+        ctrlMat = np.zeros((len(self._ss), nDOF, nDOF), dtype=complex)
+        for (dof_to, dof_from), filt in self._filters.items():
+            toInd = self._dof_index[dof_to]
+            fromInd = self._dof_index[dof_from]
+            ctrlMat[:, toInd, fromInd] = self._computeFilter(filt)
         return ctrlMat
 
+    def _computeFilter(self, filt):
+        """Evaluate a filter on the frequency vector of the control system
+
+        The same Filter instance is often used for several DOFs or drives,
+        so each instance is only evaluated once per run.
+
+        Inputs:
+          filt: the Filter instance
+        """
+        key = id(filt)
+        if key not in self._filt_cache:
+            self._filt_cache[key] = filt._filt(self._ss)
+        return self._filt_cache[key]
+
     def _computeCompensator(self):
-        nff = len(self.ss)
-        ndrives = len(self.drives)
-        ones = np.ones(nff)
-        compMat = np.zeros((ndrives, ndrives, nff), dtype=complex)
-        compdrives = [cf[0] for cf in self._compFilts]
-        for di, drive in enumerate(self.drives):
-            try:
-                ind = compdrives.index(drive)
-                compMat[di, di, :] = self._compFilts[ind][-1]._filt(self.ss)
-            except ValueError:
-                compMat[di, di, :] = ones
-        return compMat
+        """Compute the compensation filters of the drives
+
+        Returns:
+          compDiag: the (nFreq, nDrives) diagonal of the compensator matrix
+            or None if there are no compensation filters
+        """
+        if not self._compFilts:
+            return None
+        compDiag = np.ones((len(self._ss), len(self.drives)), dtype=complex)
+        for drive, filt in self._compFilts.items():
+            # filters can be set for drives that are not part of any DOF
+            if drive in self._drive_index:
+                compDiag[:, self._drive_index[drive]] = self._computeFilter(filt)
+        return compDiag
 
     def _computeResponse(self):
-        nff = len(self.ss)
-        ndrives = len(self.drives)
-        ones = np.ones(nff)
-        actMat = np.zeros((ndrives, ndrives, nff), dtype=complex)
-        actdrives = [rf[0] for rf in self._actFilts]
-        for di, drive in enumerate(self.drives):
-            try:
-                ind = actdrives.index(drive)
-                actMat[di, di, :] = self._actFilts[ind][-1]._filt(self.ss)
-            except ValueError:
-                actMat[di, di, :] = ones
-        return actMat
+        """Compute the actuator responses of the drives
+
+        Returns:
+          actDiag: the (nFreq, nDrives) diagonal of the response matrix
+            or None if there are no actuator responses
+        """
+        if not self._actFilts:
+            return None
+        actDiag = np.ones((len(self._ss), len(self.drives)), dtype=complex)
+        for drive, filt in self._actFilts.items():
+            # filters can be set for drives that are not part of any DOF
+            if drive in self._drive_index:
+                actDiag[:, self._drive_index[drive]] = self._computeFilter(filt)
+        return actDiag
 
     def _computeMechMod(self):
+        """Compute the radiation pressure modifications between drives
+
+        Returns:
+          mMech: a (nFreq, nDrives, nDrives) array
+        """
         nDrives = len(self.drives)
         nff = len(self.ff)
-        mMech = np.zeros((nDrives, nDrives, nff), dtype=complex)
-        for dit, driveTo in enumerate(self.drives):
-            driveData = driveTo.split('.')
-            driveToName = driveData[0]
-            dofToType = driveData[-1]
-            for djf, driveFrom in enumerate(self.drives):
-                driveData = driveFrom.split('.')
-                driveFromName = driveData[0]
-                dofFromType = driveData[-1]
-                if dofFromType != dofToType:
-                    msg = 'Input and output drives should be the same ' \
-                          + 'degree of freedom (pos, pitch, or yaw)'
-                    raise ValueError(msg)
-                mMech[dit, djf, :] = self.plant_model.getMechMod(
-                    driveToName, driveFromName, dofToType)
-        return mMech
+        doftypes = set(doftype for _, doftype in self._drive_split)
+        if len(doftypes) > 1:
+            msg = 'Input and output drives should be the same ' \
+                  + 'degree of freedom (pos, pitch, or yaw)'
+            raise ValueError(msg)
+
+        # fall back to computing each element separately if the model can't
+        # compute the whole matrix at once
+        if not hasattr(self.plant_model, 'getMechModMatrix'):
+            mMech = np.zeros((nff, nDrives, nDrives), dtype=complex)
+            for dit, (driveToName, doftype) in enumerate(self._drive_split):
+                for djf, (driveFromName, _) in enumerate(self._drive_split):
+                    mMech[:, dit, djf] = self.plant_model.getMechMod(
+                        driveToName, driveFromName, doftype)
+            return mMech
+
+        if nDrives == 0:
+            return np.zeros((nff, 0, 0), dtype=complex)
+
+        names = [driveName for driveName, _ in self._drive_split]
+        mMech = self.plant_model.getMechModMatrix(names, doftypes.pop())
+        return np.moveaxis(mMech, -1, 0)
 
     def _computeBeamSpotMotion(self):
         nDrives = len(self.drives)
         nff = len(self.ff)
-        drive2bsm = np.zeros((nDrives, nDrives, nff), dtype=complex)
-        for si, spot_drive in enumerate(self.drives):
-            opticName = spot_drive.split('.')[0]
-            for di, drive in enumerate(self.drives):
-                driveData = drive.split('.')
-                driveName = driveData[0]
-                doftype = driveData[-1]
+        drive2bsm = np.zeros((nff, nDrives, nDrives), dtype=complex)
+        for si, (opticName, _) in enumerate(self._drive_split):
+            for di, (driveName, doftype) in enumerate(self._drive_split):
                 # FIXME: make work with finesse and non-front surfaces
-                drive2bsm[si, di] = self.plant_model.computeBeamSpotMotion(
+                drive2bsm[:, si, di] = self.plant_model.computeBeamSpotMotion(
                     opticName, 'fr', driveName, doftype)
 
         self._drive2bsm = drive2bsm
@@ -814,40 +1006,61 @@ class ControlSystem:
           tstpnt: the test point
         """
         if tstpnt == 'err':
-            oltf = self.getTF('', 'err', '', 'ctrl', closed=False)
+            oltf = self._getTF('err', 'ctrl', closed=False)
             oltf = multiplyMat(oltf, self._ctrlMat)
 
         elif tstpnt == 'sens':
-            oltf = self.getTF('', 'sens', '', 'err', closed=False)
+            oltf = self._getTF('sens', 'err', closed=False)
             oltf = multiplyMat(oltf, self._inMat)
 
         elif tstpnt == 'drive':
-            oltf = self.getTF('', 'drive', '', 'sens', closed=False)
+            oltf = self._getTF('drive', 'sens', closed=False)
             oltf = multiplyMat(oltf, self._plant)
 
         elif tstpnt == 'act':
-            oltf = self.getTF('', 'act', '', 'drive', closed=False)
-            oltf = multiplyMat(oltf, self._actMat)
+            oltf = self._getTF('act', 'drive', closed=False)
+            oltf = self._applyResponse(oltf)
 
         elif tstpnt == 'ctrl':
-            oltf = self.getTF('', 'ctrl', '', 'act', closed=False)
+            oltf = self._getTF('ctrl', 'act', closed=False)
             oltf = multiplyMat(oltf, self._outComp)
 
         return oltf
 
-    def _computeCLTF(self, oltf):
-        """Compute the CLTF from an OLTF
+    def _applyResponse(self, mat):
+        """Multiply a matrix by the actuator responses on the right
+
+        If no responses are defined this is the identity and the matrix is
+        returned without any multiplication.
         """
-        # transpose so that numpy can invert without a loop
-        oltf = np.einsum('ijf->fij', oltf)
+        if self._actDiag is not None:
+            return multiplyDiag(mat, self._actDiag)
+        elif np.isscalar(mat):
+            ones = np.ones((len(self._ss), len(self.drives)), dtype=complex)
+            return multiplyDiag(mat, ones)
+        else:
+            return mat
 
-        # make the 3D identity matrix
-        ident = np.zeros_like(oltf)
-        inds = np.arange(oltf.shape[-1])
-        ident[:, inds, inds] = 1
+    def _computeCLTF(self, oltf, rhs=None):
+        """Compute the CLTF from an OLTF
 
-        # invert and transpose back
-        cltf = np.einsum('fij->ijf', inv(ident - oltf))
+        Inputs:
+          oltf: the OLTF
+          rhs: if not None, the matrix the CLTF multiplies. The product
+            CLTF @ rhs is then found by solving the linear system instead of
+            inverting explicitly. (Default: None)
+        """
+        # the frequency is the first index so numpy inverts all frequencies
+        # in a single batched call. Form 1 - OLTF in place by adding one to
+        # the diagonal rather than building an identity for every frequency
+        lhs = np.negative(oltf)
+        diag = np.arange(oltf.shape[-1])
+        lhs[..., diag, diag] += 1
+        if rhs is None:
+            cltf = inv(lhs)
+        else:
+            rhs = np.broadcast_to(rhs, oltf.shape[:-1] + rhs.shape[-1:])
+            cltf = solve(lhs, rhs)
 
         return cltf
 
@@ -859,17 +1072,12 @@ class ControlSystem:
           dof_from: input DOF
           filt: Filter instance for the filter
         """
-        dofs_to = np.array([filt[0] for filt in self._filters])
-        dofs_from = np.array([filt[1] for filt in self._filters])
-        inds = [ind for ind, (d1, d2) in enumerate(zip(dofs_to, dofs_from))
-                if d1 == dof_to and d2 == dof_from]
-
-        if len(inds) > 0:
+        if (dof_to, dof_from) in self._filters:
             raise ValueError(
                 'There is already a filter from {:s} to {:s}'.format(
                     dof_from, dof_to))
 
-        self._filters.append((dof_to, dof_from, filt))
+        self._filters[(dof_to, dof_from)] = filt
 
     def addCompensator(self, drive, doftype, filt):
         """Add a compensation filter
@@ -880,11 +1088,11 @@ class ControlSystem:
           filt: Filter instance for the filter
         """
         drive += '.' + doftype
-        if drive in [cf[0] for cf in self._compFilts]:
+        if drive in self._compFilts:
             raise ValueError(
                 'A compensator is already set for drive {:s}'.format(drive))
 
-        self._compFilts.append((drive, filt))
+        self._compFilts[drive] = filt
 
     def setActuator(self, drive, doftype, filt):
         """Set the actuation plant for a drive
@@ -895,11 +1103,11 @@ class ControlSystem:
           filt: Filter instance for the plant
         """
         drive += '.' + doftype
-        if drive in [rf[0] for rf in self._actFilts]:
+        if drive in self._actFilts:
             raise ValueError(
                 'A response is already set for drive {:s}'.format(drive))
 
-        self._actFilts.append((drive, filt))
+        self._actFilts[drive] = filt
 
     def getFilter(self, dof_to, dof_from):
         """Get the filter between two DOFs
@@ -911,19 +1119,11 @@ class ControlSystem:
         Returns:
           filt: the filter
         """
-        dofs_to = np.array([filt[0] for filt in self._filters])
-        dofs_from = np.array([filt[1] for filt in self._filters])
-        inds = [ind for ind, (d1, d2) in enumerate(zip(dofs_to, dofs_from))
-                if d1 == dof_to and d2 == dof_from]
-        nfilts = len(inds)
-
-        if nfilts == 0:
+        try:
+            return self._filters[(dof_to, dof_from)]
+        except KeyError:
             raise ValueError('There is no filter from {:s} to {:s}'.format(
                 dof_from, dof_to))
-        elif nfilts > 1:
-            raise ValueError('There are multiple filters')
-        else:
-            return self._filters[inds[0]][-1]
 
     def getActuator(self, drive):
         """Get the actuation filter for a drive
@@ -934,11 +1134,9 @@ class ControlSystem:
         Returns:
           filt: the filter
         """
-        drives = [rf[0] for rf in self._actFilts]
         try:
-            ind = drives.index(drive)
-            return self._actFilts[ind][-1]
-        except ValueError:
+            return self._actFilts[drive]
+        except KeyError:
             raise ValueError('No actuator is set for ' + drive)
 
     def getCompensator(self, drive):
@@ -950,11 +1148,9 @@ class ControlSystem:
         Returns:
           filt: the filter
         """
-        drives = [rf[0] for rf in self._actFilts]
         try:
-            ind = drives.index(drive)
-            return self._actFilts[ind][-1]
-        except ValueError:
+            return self._compFilts[drive]
+        except KeyError:
             raise ValueError(drive + ' does not have a compensation filter')
 
     def getOLTF(self, sig_to, sig_from, tstpnt):
@@ -965,7 +1161,7 @@ class ControlSystem:
           sig_from: input signal
           tstpnt: which test point to compute the TF for
         """
-        oltf = self._oltf[tstpnt]
+        oltf = freq_last(self._oltf[tstpnt])
         if sig_from:
             from_ind = self._getIndex(sig_from, tstpnt)
             oltf = oltf[:, from_ind]
@@ -982,7 +1178,7 @@ class ControlSystem:
           sig_from: input signal
           tstpnt: which test point to compute the TF for
         """
-        cltf = self._cltf[tstpnt]
+        cltf = freq_last(self._getTF(tstpnt, tstpnt))
         if sig_from:
             from_ind = self._getIndex(sig_from, tstpnt)
             cltf = cltf[:, from_ind]
@@ -1038,49 +1234,73 @@ class ControlSystem:
         If sig_to is the empty string '', the vector to all signals is returned
         If sig_from is the empty string '', the vector of all signals is returned
         """
-        def cltf_or_unity(tp_to):
-            """Returns the CLTF if a closed loop TF is necessary and the identity
-            matrix if an open loop TF is necessary
-            """
-            if closed:
-                return self._cltf[tp_to]
-            else:
-                return 1
+        tf = freq_last(self._getTF(tp_to, tp_from, closed=closed))
+
+        # Reduce size of returned TF if necessary
+        if sig_from:
+            from_ind = self._getIndex(sig_from, tp_from)
+            tf = tf[:, from_ind]
+
+        if sig_to:
+            to_ind = self._getIndex(sig_to, tp_to)
+            tf = tf[to_ind]
+
+        # copy so that modifying the result doesn't change the cached TFs
+        if isinstance(tf, np.ndarray):
+            tf = tf.copy()
+
+        return tf
+
+    def _getTF(self, tp_to, tp_from, closed=True):
+        """Get the matrix of transfer functions between two test points
 
-        # test points and their matrices in cyclic order for computing TFs
-        # around the main loop
-        tstpnts = ['err', 'sens', 'drive', 'act', 'ctrl']
-        mats = [self._inMat, self._plant, self._actMat, self._outComp,
-                self._ctrlMat]
+        The matrix is returned with the frequency as the first index.
+        The matrices don't change until the control system is run again,
+        so each one is only computed once and then cached. See getTF.
+        """
+        key = (tp_to, tp_from, closed)
+        if key not in self._tf_cache:
+            self._tf_cache[key] = self._computeTF(tp_to, tp_from, closed)
+        return self._tf_cache[key]
+
+    def _computeTF(self, tp_to, tp_from, closed):
+        """Compute the matrix of transfer functions between two test points
 
+        See _getTF.
+        """
         # Main loop if the input test point is not a calibration test point
-        if tp_from in tstpnts:
+        if tp_from in _LOOP_TSTPNTS:
 
             # If the test points are the same, this is just a CLTF
+            # or the identity if an open loop TF is necessary
             if tp_to == tp_from:
-                tf = cltf_or_unity(tp_to)
+                if closed:
+                    tf = self._computeCLTF(self._oltf[tp_to])
+                else:
+                    tf = 1
 
             # Main loop if the output test point is not pos or beam spot motion
-            elif tp_to in tstpnts:
-                start = False
-                tf = cltf_or_unity(tp_to)
-                for tstpnt, mat in zip(cycle(tstpnts), cycle(mats)):
-                    if tstpnt != tp_to and not start:
-                        continue
-                    start = True
-                    if tstpnt == tp_from:
-                        break
-                    tf = multiplyMat(tf, mat)
+            elif tp_to in _LOOP_TSTPNTS:
+                # matrices from the next test point in the loop to each one
+                mats = {'err': self._inMat, 'sens': self._plant,
+                        'act': self._outComp, 'ctrl': self._ctrlMat}
+                tf = 1
+                for tstpnt in _LOOP_PATHS[(tp_to, tp_from)]:
+                    # the actuator responses are stored as a diagonal
+                    if tstpnt == 'drive':
+                        tf = self._applyResponse(tf)
+                    else:
+                        tf = multiplyMat(tf, mats[tstpnt])
+
+                # apply the CLTF by solving for its product with the loop
+                if closed:
+                    tf = self._computeCLTF(self._oltf[tp_to], tf)
 
             # If the output test point is pos or beam spot motion, first compute
             # the TF to drive and then prepend the corrections
             elif tp_to in ['pos', 'spot']:
                 # Get the loop transfer function to drives
-                if tp_from == 'drive':
-                    loopTF = cltf_or_unity('drive')
-                else:
-                    loopTF = self.getTF(
-                        '', 'drive', '', tp_from, closed=closed)
+                loopTF = self._getTF('drive', tp_from, closed=closed)
 
                 # for pos, apply mechanical modification
                 if tp_to == 'pos':
@@ -1097,22 +1317,13 @@ class ControlSystem:
         # If the input test point is a calibration test point, first compute
         # the TF from the corresponding drive and append the output matrix
         elif tp_from == 'cal':
-            loopTF = self.getTF('', tp_to, '', 'drive', closed=closed)
+            loopTF = self._getTF(tp_to, 'drive', closed=closed)
             tf = multiplyMat(loopTF, self._outMat)
 
         # No valid input test point
         else:
             raise ValueError('Unrecognized test point from ' + tp_from)
 
-        # Reduce size of returned TF if necessary
-        if sig_from:
-            from_ind = self._getIndex(sig_from, tp_from)
-            tf = tf[:, from_ind]
-
-        if sig_to:
-            to_ind = self._getIndex(sig_to, tp_to)
-            tf = tf[to_ind]
-
         return tf
 
     def getTotalNoiseTo(self, sig_to, tp_to, tp_from, noiseASDs, closed=True):
@@ -1136,17 +1347,23 @@ class ControlSystem:
             ampTF = self.getTF(sig_to, tp_to, '', tp_from, closed=closed)
         if len(ampTF.shape) == 1:
             ampTF = np.einsum('i,j->ij', ampTF, np.ones_like(self.ff))
-        powTF = np.abs(ampTF)**2
-        totalPSD = np.zeros(powTF.shape[-1])
-        for dof_from, noiseASD in noiseASDs.items():
-            from_ind = self._getIndex(dof_from, tp_from)
-            totalPSD += powTF[from_ind] * noiseASD**2
+        nff = ampTF.shape[-1]
+        if not noiseASDs:
+            return np.zeros(nff)
+
+        # add all of the noise PSDs at once
+        from_inds = [self._getIndex(dof_from, tp_from)
+                     for dof_from in noiseASDs.keys()]
+        noisePSDs = np.array([np.broadcast_to(noiseASD, nff)
+                              for noiseASD in noiseASDs.values()])**2
+        powTF = _abs2(ampTF[from_inds])
+        totalPSD = np.sum(powTF * noisePSDs, axis=0)
         return np.sqrt(totalPSD)
 
     # FIXME:
     # def getTotalNoiseFrom(self, sig_to, sig_from, tp_from, noiseASDs):
     #     ampTF = self.getTF('', sig_to, sig_from, tp_from)
-    #     powTF = np.abs(ampTF)**2
+    #     powTF = _abs2(ampTF)
     #     totalPSD = np.zeros(powTF.shape[-1])
     #     for dof_to, noiseASD in noiseASDs.items():
     #         to_ind = self._getIndex(dof_to, sig_to)
@@ -1173,11 +1390,11 @@ class ControlSystem:
           tstpnt: type of test point
         """
         if tstpnt in ['err', 'ctrl', 'cal']:
-           sig_list = list(self.dofs.keys())
+            sig_index = self._dof_index
         elif tstpnt in ['act', 'drive', 'pos', 'spot']:
-            sig_list = self.drives
+            sig_index = self._drive_index
         elif tstpnt == 'sens':
-            sig_list = self.probes
+            sig_index = self._probe_index
         else:
             raise ValueError('Unrecognized test point ' + tstpnt)
 
@@ -1205,8 +1422,8 @@ class ControlSystem:
             name = name_or_dof
 
         try:
-            ind = sig_list.index(name)
-        except ValueError:
+            ind = sig_index[name]
+        except KeyError:
             raise ValueError(
                 '{:s} is not a {:s} test point'.format(name, tstpnt))
 
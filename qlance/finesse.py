@@ -15,9 +15,19 @@ from numbers import Number
 import pandas as pd
 from tqdm import tqdm
 from itertools import compress
+import inspect
 import matplotlib.pyplot as plt
 from pykat.external.peakdetect import peakdetect
 
+try:
+    from joblib import Parallel, delayed
+    # Parallel can only return results as they finish since joblib 1.3
+    _parallel_kwargs = {}
+    if 'return_as' in inspect.signature(Parallel).parameters:
+        _parallel_kwargs['return_as'] = 'generator'
+except ImportError:
+    Parallel = None
+
 
 def addMirror(
         kat, name, Chr=0, Thr=0, Lhr=0, Rar=0, Lmd=0, Nmd=1.45, phi=0,
@@ -1225,6 +1235,131 @@ def showsigDC(basekat, verbose=False):
         display(sigDC)
 
 
+def _setup_sweep(basekat, probes, rtype, fmin, fmax, npts, linlog, verbose):
+    """Make a copy of a model set up for a frequency response sweep
+
+    Nothing here depends on the drive, so this is done once for all drives.
+    See KatFR.run for the inputs.
+    """
+    kat = basekat.deepcopy()
+    if verbose <= 1:
+        kat.verbose = False
+
+    # setup the sweep frequency
+    kat.signals.f = 1
+    kat.add(
+        kcmd.xaxis(linlog, [fmin, fmax], kat.signals.f, npts))
+
+    kat.yaxis = 're:im'
+
+    # apply the signal to each photodiode
+    if rtype in ['opt', 'both']:
+        for demod in _get_signal_demods(kat, probes):
+            demod.put(kat.xaxis.x)
+
+    return kat
+
+
+def _get_signal_demods(kat, probes):
+    """Get the demodulation frequencies the signal frequency is applied to
+
+    Homodyne detectors don't have demodulations and the signal is applied to
+    the last demodulation of each photodiode. All of the probes are checked
+    before any are returned.
+
+    Inputs:
+      kat: the finesse model
+      probes: list of probe names
+
+    Returns:
+      demods: list of the demodulation frequency parameters
+    """
+    demods = []
+    for probe in probes:
+        det = kat.detectors[probe]
+
+        # homodyne detectors don't have demodulations
+        if isinstance(det, (kdet.hd, kdet.qhd)):
+            continue
+
+        # apply signal to last demodulation for PD's
+        if det.num_demods == 0:
+            raise ValueError(
+                '{:s} has no demodulations'.format(probe))
+        if det.num_demods == 1:
+            demods.append(det.f1)
+        elif det.num_demods == 2:
+            demods.append(det.f2)
+
+        else:
+            raise ValueError(
+                '{:s} has too many demodulations'.format(probe))
+
+    return demods
+
+
+def _run_drive(kat, drive, doftype, rtype, probes, pos_detectors):
+    """Compute the frequency response of a single drive
+
+    This is used by KatFR.run so that drives can be computed in separate
+    threads. The model kat should already be set up with _setup_sweep and is
+    not modified. See KatFR.run for the other inputs.
+
+    Returns:
+      freqresp: dictionary of the responses of the probes to the drive
+        (None if rtype is 'mech')
+      mech_plant: the mechanical plant of the drive (None if rtype is 'opt')
+      mechmod: dictionary of the radiation pressure modifications to the
+        position detectors (None if rtype is 'opt')
+      ff: the frequency vector [Hz]
+    """
+    freqresp = None
+    mech_plant = None
+    mechmod = None
+
+    ############################################################
+    # compute the optomechanical plant
+    ############################################################
+    if rtype in ['opt', 'both']:
+        kat_opt = kat.deepcopy()
+
+        # run the simulation
+        kat_opt.signals.apply(
+            get_drive_dof(kat, drive, doftype, force=False), 1, 0)
+        if doftype == 'pos':
+            kat_opt.scale = 'meter'
+        out = kat_opt.run()
+
+        # store the results
+        freqresp = {probe: out[probe] for probe in probes}
+
+    ############################################################
+    # compute the radiation pressure loop suppression function
+    ############################################################
+    if rtype in ['mech', 'both']:
+        kat_mech = kat.deepcopy()
+
+        # run the simulation
+        kat_mech.signals.apply(
+            get_drive_dof(kat, drive, doftype, force=True), 1, 0)
+        out = kat_mech.run()
+
+        # extract the mechanical plant for this drive
+        comp = kat_mech.components[drive]
+        if doftype in ['pos', 'pitch', 'yaw']:
+            mech_plant = ctrl.Filter(*extract_zpk(comp, doftype), Hz=False)
+            tf = mech_plant.computeFilter(out.x)
+        else:
+            mech_plant = ctrl.Filter([], [], 1)
+            tf = np.ones_like(out.x)
+
+        # store the results
+        mechmod = {drive_out: out[drive_out] / tf
+                   for drive_out in pos_detectors}
+
+    return freqresp, mech_plant, mechmod, out.x
+
+
 class KatFR(plant.FinessePlant):
     """Frequency response of Finesse models
 
@@ -1283,7 +1418,7 @@ class KatFR(plant.FinessePlant):
         """
         kat = self.kat.deepcopy()
         set_all_probe_response(kat, 'dc')
-        kat.parse('yaxis re:im')
+        kat.yaxis = 're:im'
         kat.noxaxis = True
         kat.verbose = verbose
         out = kat.run()
@@ -1293,7 +1428,7 @@ class KatFR(plant.FinessePlant):
             self._dcsigs[sig] = out[sig]
 
     def run(self, fmin, fmax, npts, doftype='pos', linlog='log', rtype='both',
-               verbose=1):
+               verbose=1, n_jobs=1):
         """Compute the frequency response
 
         Inputs:
@@ -1311,6 +1446,11 @@ class KatFR(plant.FinessePlant):
             0: no information is printed
             1: a progress bar of each drive is printed
             2: show the finesse simulation progress bars as well
+          n_jobs: number of drives to compute at once in separate threads,
+            each running its own finesse process. If -1, one thread per core
+            is used. Requires joblib if not 1. With joblib older than 1.3
+            the progress bar is only updated once all drives are done.
+            (Default: 1)
         """
         ############################################################
         # Initialize response dictionaries
@@ -1327,6 +1467,7 @@ class KatFR(plant.FinessePlant):
 
         if rtype in ['opt', 'both']:
             self._freqresp[doftype] = {probe: {} for probe in self.probes}
+            self._freqresp_mat.pop(doftype, None)
         if rtype in ['mech', 'both']:
             self._mech_plants[doftype] = {}
             if self.pos_detectors:
@@ -1335,93 +1476,52 @@ class KatFR(plant.FinessePlant):
         ############################################################
         # Loop through the drives and compute the response for each
         ############################################################
-        if verbose:
-            pbar = tqdm(total=len(drives))
-
-        for drive in drives:
-            # make a seperate kat for each drive
-            kat = self.kat.deepcopy()
-            if verbose <= 1:
-                kat.verbose = False
-
-            # setup the sweep frequency
-            kat.signals.f = 1
-            kat.add(
-                kcmd.xaxis(linlog, [fmin, fmax], kat.signals.f, npts))
-
-            kat.parse('yaxis re:im')
-
-            # apply the signal to each photodiode
-            if rtype in ['opt', 'both']:
-                for probe in self.probes:
-                    det = kat.detectors[probe]
-
-                    # homodyne detectors don't have demodulations
-                    if isinstance(det, (kdet.hd, kdet.qhd)):
-                        continue
-
-                    # apply signal to last demodulation for PD's
-                    if det.num_demods == 0:
-                        raise ValueError(
-                            '{:s} has no demodulations'.format(probe))
-                    if det.num_demods == 1:
-                        det.f1.put(kat.xaxis.x)
-                    elif det.num_demods == 2:
-                        det.f2.put(kat.xaxis.x)
-
-                    else:
-                        raise ValueError(
-                            '{:s} has too many demodulations'.format(probe))
-
-            ############################################################
-            # compute the optomechanical plant
-            ############################################################
-            if rtype in ['opt', 'both']:
-                kat_opt = kat.deepcopy()
-
-                # run the simulation
-                kat_opt.signals.apply(
-                    get_drive_dof(kat, drive, doftype, force=False), 1, 0)
-                if doftype == 'pos':
-                    kat_opt.parse('scale meter')
-                out = kat_opt.run()
-
-                # store the results
-                for probe in self.probes:
-                    self._freqresp[doftype][probe][drive] = out[probe]
-
-            ############################################################
-            # compute the radiation pressure loop suppression function
-            ############################################################
+        pbar = tqdm(total=len(drives), disable=not verbose)
+
+        kat = _setup_sweep(
+            self.kat, self.probes, rtype, fmin, fmax, npts, linlog, verbose)
+        args = (doftype, rtype, self.probes, self.pos_detectors)
+        if n_jobs != 1 and len(drives) > 1:
+            if Parallel is None:
+                raise ModuleNotFoundError(
+                    'joblib is required to compute drives in parallel')
+            # pykat models can't be pickled so use threads. Each drive spends
+            # its time waiting on the finesse process anyway. Get the results
+            # as each drive finishes to update the progress if possible
+            results = Parallel(
+                n_jobs=n_jobs, backend='threading', **_parallel_kwargs)(
+                    delayed(_run_drive)(kat, drive, *args) for drive in drives)
+        else:
+            results = (_run_drive(kat, drive, *args) for drive in drives)
+
+        computed = []
+        for result in results:
+            computed.append(result)
+            pbar.update()
+        pbar.close()
+        results = computed
+
+        # store the optomechanical responses in one array and keep views of
+        # it in the response dictionaries
+        if rtype in ['opt', 'both'] and drives:
+            nff = len(results[0][-1])
+            mat = np.empty(
+                (len(self.probes), len(drives), nff), dtype=np.complex128)
+            for di, (drive, result) in enumerate(zip(drives, results)):
+                freqresp = result[0]
+                for pi, probe in enumerate(self.probes):
+                    mat[pi, di] = freqresp[probe]
+                    self._freqresp[doftype][probe][drive] = mat[pi, di]
+            self._setFreqrespMatrix(doftype, mat, self.probes, drives)
+
+        # store the mechanical responses
+        for drive, (_, mech_plant, mechmod, ff) in zip(drives, results):
             if rtype in ['mech', 'both']:
-                kat_mech = kat.deepcopy()
-
-                # run the simulation
-                kat_mech.signals.apply(
-                    get_drive_dof(kat, drive, doftype, force=True), 1, 0)
-                out = kat_mech.run()
-
-                # extract the mechanical plant for this drive
-                comp = kat_mech.components[drive]
-                if doftype in ['pos', 'pitch', 'yaw']:
-                    plant = ctrl.Filter(*extract_zpk(comp, doftype), Hz=False)
-                    self._mech_plants[doftype][drive] = plant
-                    tf = plant.computeFilter(out.x)
-                else:
-                    self._mech_plants[doftype][drive] = ctrl.Filter([], [], 1)
-                    tf = np.ones_like(out.x)
-
-                # store the results
+                self._mech_plants[doftype][drive] = mech_plant
                 for drive_out in self.pos_detectors:
-                    self._mechmod[doftype][drive_out][drive] = out[drive_out] / tf
-
-            if verbose:
-                pbar.update()
-
-        if verbose:
-            pbar.close()
+                    self._mechmod[doftype][drive_out][drive] = mechmod[drive_out]
 
-        self._ff = out.x
+        self._ff = ff
 
     def addDrives(self, drives):
         """Add drives to the list of drives to compute
@@ -1533,7 +1633,7 @@ class KatSweep:
             kat.add(kcmd.func(name, func))
             comp.put(kat.commands[name].output)
 
-        kat.parse('yaxis re:im')
+        kat.yaxis = 're:im'
         if debug:
             return kat
         out = kat.run()
@@ -3,7 +3,6 @@ Code for plant fitting and interfacing with IIRrational
 """
 
 import numpy as np
-from functools import partial
 from IIRrational.v2 import data2filter
 from . import controls as ctrl
 
@@ -59,10 +58,7 @@ class PlantFit(ctrl.Filter):
         THIS SHOULD ONLY BE USED TO MANIPULATE THE FIT
         """
         a = (-2*np.pi)**Hz
-        self._zs = a*zs
-        self._ps = a*ps
-        self._k = a*k
-        self._filt = partial(ctrl.zpk, self._zs, self._ps, self._k)
+        self._update_zpk(a*zs, a*ps, a*k)
 
     def _get_fit_zpk(self):
         """Get the zpk of the current fit
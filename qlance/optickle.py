@@ -786,8 +786,8 @@ class Optickle(plant.OpticklePlant):
             probes = [probes]
         mProbeOut = np.identity(len(self.probes))
         for probe in probes:
-            nA = self.probes.index(probe + '_SUM')
-            nB = self.probes.index(probe + '_DIFF')
+            nA = self._getProbeIndex(probe + '_SUM')
+            nB = self._getProbeIndex(probe + '_DIFF')
             mProbeOut[nA, nA] = 1
             mProbeOut[nB, nA] = -1
             mProbeOut[nA, nB] = 1
@@ -1118,7 +1118,7 @@ class Optickle(plant.OpticklePlant):
           poses: the positions of the drive
           sig: signal power at those positions [W]
         """
-        probeNum = self.probes.index(probeName)
+        probeNum = self._getProbeIndex(probeName)
         driveNum = self._getDriveIndex(driveName, 'pos')
 
         poses = self._poses[driveNum, :]
@@ -1270,6 +1270,7 @@ class Optickle(plant.OpticklePlant):
         """
         self._probes = self._eval(self.optName + ".getProbeName", 1)
         self._drives = self._eval(self.optName + ".getDriveNames", 1)
+        self._updateIndices()
         self._topology.update(*build_dicts(self))
 
     def _eval(self, cmd, nargout=0):
@@ -12,6 +12,11 @@ import h5py
 from numbers import Number
 from .utils import beam_properties_from_q, get_default_kwargs
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 
 class OpticklePlant:
     """An Optickle optomechanical plant
@@ -23,6 +28,8 @@ class OpticklePlant:
         self._pol = None
         self._probes = []
         self._drives = []
+        self._probe_index = {}
+        self._drive_index = {}
         self._ff = None
         self._fDC = None
         self._sigAC = {}
@@ -174,10 +181,10 @@ class OpticklePlant:
         # figure out the shape of the TF
         if isinstance(self.ff, Number):
             # TF is at a single frequency
-            tf = 0
+            tf = np.complex128(0)
         else:
             # TF is for a frequency vector
-            tf = np.zeros(len(self.ff), dtype='complex')
+            tf = np.zeros(len(self.ff), dtype=np.complex128)
 
         if optOnly:
             tfData = self._mOpt
@@ -206,7 +213,7 @@ class OpticklePlant:
         # loop through the drives and probes to compute the TF
         for probe, pc in probes.items():
             # get the probe index
-            probeNum = self.probes.index(probe)
+            probeNum = self._getProbeIndex(probe)
 
             for drive, drive_pos in drives.items():
                 # get the drive index
@@ -220,6 +227,37 @@ class OpticklePlant:
 
         return tf
 
+    def getTFMatrix(self, probes, drives, doftype='pos'):
+        """Compute the matrix of transfer functions from drives to probes
+
+        Inputs:
+          probes: list of probe names
+          drives: list of drive names
+          doftype: degree of freedom of the drives (Default: pos)
+
+        Returns:
+          tfs: a (nProbes, nDrives, nFreq) array of the transfer functions
+            from each drive to each probe. See getTF for the units.
+        """
+        if doftype not in self._doftypes:
+            raise ValueError('Unrecognized degree of freedom {:s}'.format(doftype))
+
+        if self._sigAC is None:
+            msg = 'Must run tickle for the appropriate DOF before ' \
+                  + 'calculating a transfer function.'
+            raise RuntimeError(msg)
+        tfData = self._sigAC[self._doftype2pos(doftype)]
+
+        # index the full matrix directly if it has a probe index
+        if len(tfData.shape) == 3:
+            probeNums = [self._getProbeIndex(probe) for probe in probes]
+            driveNums = [self._getDriveIndex(drive, doftype) for drive in drives]
+            return tfData[np.ix_(probeNums, driveNums)]
+
+        else:
+            return np.array([[self.getTF(probe, drive, doftype=doftype)
+                              for drive in drives] for probe in probes])
+
     def getMechMod(self, drive_out, drive_in, doftype='pos'):
         """Get the radiation pressure modifications to drives
 
@@ -272,6 +310,33 @@ class OpticklePlant:
 
         return mMech[driveOutNum, driveInNum]
 
+    def getMechModMatrix(self, drives, doftype='pos'):
+        """Get the matrix of radiation pressure modifications between drives
+
+        Inputs:
+          drives: list of drive names
+          doftype: degree of freedom: pos, pitch, or yaw (Default: pos)
+
+        Returns:
+          mMech: a (nDrives, nDrives, nFreq) array of the modifications from
+            each drive to each drive. See getMechMod.
+        """
+        if doftype not in self._doftypes:
+            raise ValueError('Unrecognized degree of freedom {:s}'.format(doftype))
+
+        if doftype in ['pos', 'drive', 'amp', 'phase']:
+            mMech = self._mMech['pos']
+        else:
+            mMech = self._mMech[doftype]
+
+        if mMech is None:
+            msg = 'Must run tickle for the appropriate DOF before ' \
+                  + 'calculating a transfer function.'
+            raise RuntimeError(msg)
+
+        driveNums = [self._getDriveIndex(drive, doftype) for drive in drives]
+        return mMech[np.ix_(driveNums, driveNums)]
+
     def getMechTF(self, outDrives, inDrives, doftype='pos'):
         """Compute a mechanical transfer function
 
@@ -291,10 +356,10 @@ class OpticklePlant:
         # figure out the shape of the TF
         if isinstance(self.ff, Number):
             # TF is at a single frequency
-            tf = 0
+            tf = np.complex128(0)
         else:
             # TF is for a frequency vector
-            tf = np.zeros(len(self.ff), dtype='complex')
+            tf = np.zeros(len(self.ff), dtype=np.complex128)
 
         if not isinstance(outDrives, ctrl.DegreeOfFreedom):
             outDrives = ctrl.DegreeOfFreedom(outDrives, doftype=doftype)
@@ -311,9 +376,12 @@ class OpticklePlant:
                 if k == 0:
                     plant = ctrl.Filter([], [], 1)
 
+            # the plant is the same for all of the output drives
+            plant_tf = c_in * plant.computeFilter(self.ff)
+
             for outDrive, c_out in outDrives.dofs():
                 mmech = self.getMechMod(outDrive, inDrive)
-                tf += c_in * c_out * plant.computeFilter(self.ff) * mmech
+                tf += c_out * plant_tf * mmech
 
         return tf
 
@@ -334,7 +402,7 @@ class OpticklePlant:
 
         Returns the quantum noise at a given probe in [W/rtHz]
         """
-        probeNum = self.probes.index(probeName)
+        probeNum = self._getProbeIndex(probeName)
         try:
             qnoise = self._noiseAC[doftype][probeNum, :]
         except IndexError:
@@ -457,7 +525,7 @@ class OpticklePlant:
         Returns:
           power: the DC power on the probe [W]
         """
-        probeNum = self.probes.index(probeName)
+        probeNum = self._getProbeIndex(probeName)
         return self._sigDC_tickle[probeNum]
 
     def computeBeamSpotMotion(self, opticName, spotPort, driveName, doftype):
@@ -567,6 +635,7 @@ class OpticklePlant:
         self._pol = np.array(io.byte2str(data['pol'][()]))
         self._probes = io.byte2str(data['probes'][()])
         self._drives = io.byte2str(data['drives'][()])
+        self._updateIndices()
         self._ff = data['ff'][()]
         self._fDC = data['fDC'][()]
         self._sigAC = io.hdf5_to_dict(data['sigAC'])
@@ -582,14 +651,38 @@ class OpticklePlant:
             self._optickle_sha = '???'
         data.close()
 
+    def _updateIndices(self):
+        """Update the dictionaries of probe and drive indices
+        """
+        # MATLAB returns a single name as a string instead of a list
+        probes = self.probes
+        if isinstance(probes, str):
+            probes = [probes]
+        drives = self.drives
+        if isinstance(drives, str):
+            drives = [drives]
+        self._probe_index = {probe: ind for ind, probe in enumerate(probes)}
+        self._drive_index = {drive: ind for ind, drive in enumerate(drives)}
+
+    def _getProbeIndex(self, name):
+        """Find the probe index of a given probe
+        """
+        try:
+            return self._probe_index[name]
+        except KeyError:
+            raise ValueError('{:s} is not a probe in this model'.format(name))
+
     def _getDriveIndex(self, name, doftype):
         """Find the drive index of a given drive and degree of freedom
         """
         if doftype in ['pos', 'pitch', 'yaw']:
-            driveNum = self.drives.index(name + '.pos')
+            drive = name + '.pos'
         elif doftype in ['drive', 'amp', 'phase']:
-            driveNum = self.drives.index('{:s}.{:s}'.format(name, doftype))
-        return driveNum
+            drive = '{:s}.{:s}'.format(name, doftype)
+        try:
+            return self._drive_index[drive]
+        except KeyError:
+            raise ValueError('{:s} is not a drive in this model'.format(drive))
 
     def _getSidebandInd(
             self, freq, lambda0=1064e-9, pol='S', ftol=1, wltol=1e-10):
@@ -696,6 +789,22 @@ class OptickleTopology:
         self._fields_probed = io.hdf5_to_dict(data['topology/fields_probed'])
 
 
+if njit is not None:
+    @njit(cache=True)
+    def _accumulate_tf(pcs, probeNums, dcs, driveNums, mat, out):
+        """Compiled kernel for FinessePlant.getTF
+
+        Adds the contributions of the probes and drives to the TF directly
+        from the stacked frequency response without gathering them first.
+        """
+        for pi in range(probeNums.size):
+            for di in range(driveNums.size):
+                coeff = pcs[pi] * dcs[di]
+                tfs = mat[probeNums[pi], driveNums[di]]
+                for fi in range(out.size):
+                    out[fi] += coeff * tfs[fi]
+
+
 class FinessePlant:
     """A Finesse Optomechanical plant
     """
@@ -707,6 +816,7 @@ class FinessePlant:
         self._pos_detectors = []
         self._bp_detectors = []
         self._freqresp = {}
+        self._freqresp_mat = {}
         self._dcsigs = {}
         self._mechmod = {}
         self._mech_plants = {}
@@ -852,28 +962,79 @@ class FinessePlant:
         if doftype not in self._doftypes:
             raise ValueError('Unrecognized doftype ' + doftype)
 
-        # figure out the shape of the TF
-        if isinstance(self.ff, Number):
-            # TF is at a single frequency
-            tf = 0
-        else:
-            # TF is for a frequency vector
-            tf = np.zeros(len(self.ff), dtype='complex')
-
         if isinstance(drives, str):
             drives = {drives: 1}
 
         if isinstance(probes, str):
             probes = {probes: 1}
 
-        # loop through the drives and probes to compute the TF
-        for probe, pc in probes.items():
-            for drive, drive_pos in drives.items():
-                # add the contribution from this drive
-                tf += pc * drive_pos * self._freqresp[doftype][probe][drive]
+        # add the contributions from all of the probes and drives at once
+        mat, probe_index, drive_index = self._getFreqrespMatrix(doftype)
+        probeNums = [probe_index[probe] for probe in probes.keys()]
+        driveNums = [drive_index[drive] for drive in drives.keys()]
+        pcs = np.array(list(probes.values()), dtype=complex)
+        dcs = np.array(list(drives.values()), dtype=complex)
+
+        if njit is not None and mat.ndim == 3:
+            tf = np.zeros(mat.shape[-1], dtype=complex)
+            _accumulate_tf(pcs, np.array(probeNums, dtype=np.intp), dcs,
+                           np.array(driveNums, dtype=np.intp), mat, tf)
+        else:
+            tf = np.einsum(
+                'p,d,pd...->...', pcs, dcs, mat[np.ix_(probeNums, driveNums)])
 
         return tf
 
+    def _getFreqrespMatrix(self, doftype):
+        """Get the frequency responses of a doftype stacked into one array
+
+        The (nProbes, nDrives, nFreq) array is built the first time it's
+        needed and is cached along with dictionaries of the probe and drive
+        indices.
+        """
+        if doftype not in self._freqresp_mat:
+            freqresp = self._freqresp[doftype]
+            probes = list(freqresp.keys())
+            drives = list(freqresp[probes[0]].keys()) if probes else []
+            mat = np.array([[freqresp[probe][drive] for drive in drives]
+                            for probe in probes], dtype=complex)
+            self._setFreqrespMatrix(doftype, mat, probes, drives)
+
+        return self._freqresp_mat[doftype]
+
+    def _setFreqrespMatrix(self, doftype, mat, probes, drives):
+        """Cache the stacked frequency responses of a doftype
+
+        Inputs:
+          doftype: the degree of freedom
+          mat: the (nProbes, nDrives, nFreq) array of responses
+          probes: list of probes indexing the first axis of mat
+          drives: list of drives indexing the second axis of mat
+        """
+        probe_index = {probe: ind for ind, probe in enumerate(probes)}
+        drive_index = {drive: ind for ind, drive in enumerate(drives)}
+        self._freqresp_mat[doftype] = (mat, probe_index, drive_index)
+
+    def getTFMatrix(self, probes, drives, doftype='pos'):
+        """Compute the matrix of transfer functions from drives to probes
+
+        Inputs:
+          probes: list of probe names
+          drives: list of drive names
+          doftype: degree of freedom of the drives (Default: pos)
+
+        Returns:
+          tfs: a (nProbes, nDrives, nFreq) array of the transfer functions
+            from each drive to each probe. See getTF for the units.
+        """
+        if doftype not in self._doftypes:
+            raise ValueError('Unrecognized doftype ' + doftype)
+
+        mat, probe_index, drive_index = self._getFreqrespMatrix(doftype)
+        probeNums = [probe_index[probe] for probe in probes]
+        driveNums = [drive_index[drive] for drive in drives]
+        return mat[np.ix_(probeNums, driveNums)]
+
     def getMechMod(self, drive_out, drive_in, doftype='pos'):
         """Get the radiation pressure modifications to drives
 
@@ -911,6 +1072,29 @@ class FinessePlant:
 
         return self._mechmod[doftype_in][out_det][drive_in]
 
+    def getMechModMatrix(self, drives, doftype='pos'):
+        """Get the matrix of radiation pressure modifications between drives
+
+        Inputs:
+          drives: list of drive names
+          doftype: degree of freedom: pos, pitch, or yaw (Default: pos)
+
+        Returns:
+          mMech: a (nDrives, nDrives, nFreq) array of the modifications from
+            each drive to each drive. See getMechMod.
+        """
+        if doftype not in self._doftypes:
+            raise ValueError('Unrecognized doftype ' + doftype)
+
+        out_dets = ['_' + drive + '_' + doftype for drive in drives]
+        for out_det in out_dets:
+            if out_det not in self.pos_detectors:
+                raise ValueError(out_det + ' is not a detector in this model')
+
+        mechmod = self._mechmod[doftype]
+        return np.array([[mechmod[out_det][drive] for drive in drives]
+                         for out_det in out_dets], dtype=complex)
+
     def getMechTF(self, outDrives, inDrives, doftype='pos'):
         """Compute a mechanical transfer function
 
@@ -930,10 +1114,10 @@ class FinessePlant:
         # figure out the shape of the TF
         if isinstance(self.ff, Number):
             # TF is at a single frequency
-            tf = 0
+            tf = np.complex128(0)
         else:
             # TF is for a frequency vector
-            tf = np.zeros(len(self.ff), dtype='complex')
+            tf = np.zeros(len(self.ff), dtype=np.complex128)
 
         if not isinstance(outDrives, ctrl.DegreeOfFreedom):
             outDrives = ctrl.DegreeOfFreedom(outDrives, doftype=doftype)
@@ -945,9 +1129,12 @@ class FinessePlant:
             # get the default mechanical plant of the optic being driven
             plant = self._mech_plants[inDrive.doftype][inDrive.name]
 
+            # the plant is the same for all of the output drives
+            plant_tf = c_in * plant.computeFilter(self.ff)
+
             for outDrive, c_out in outDrives.dofs():
                 mmech = self.getMechMod(outDrive, inDrive)
-                tf += c_in * c_out * plant.computeFilter(self.ff) * mmech
+                tf += c_out * plant_tf * mmech
 
         return tf
 
@@ -1186,6 +1373,7 @@ class FinessePlant:
         self._pos_detectors = io.byte2str(data['pos_detectors'][()])
         self._bp_detectors = io.byte2str(data['bp_detectors'][()])
         self._freqresp = io.hdf5_to_dict(data['freqresp'])
+        self._freqresp_mat = {}
         if isinstance(data['mech_plants'], h5py.Group):
             # self.mechmod = io.hdf5_to_dict(data['mechmod'])
             self._mechmod = io.hdf5_to_possible_none('mechmod', data)
@@ -0,0 +1,84 @@
+"""
+Shared fixtures for the finesse and optickle tests
+"""
+
+import os
+import hashlib
+import tempfile
+import pytest
+import qlance
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '.plant_cache')
+
+# modules that compute, save, or load the plants. Changing any of them
+# invalidates the cached plants
+PLANT_SOURCES = ['finesse.py', 'optickle.py', 'plant.py', 'controls.py', 'io.py']
+
+
+def source_hash():
+    """Hash of the qlance sources used to compute the cached plants
+    """
+    sha = hashlib.sha1()
+    src_dir = os.path.dirname(qlance.__file__)
+    for fname in PLANT_SOURCES:
+        with open(os.path.join(src_dir, fname), 'rb') as src:
+            sha.update(src.read())
+    return sha.hexdigest()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--no-plant-cache', action='store_true', default=False,
+        help='recompute plants instead of loading them from ' + CACHE_DIR)
+
+
+@pytest.fixture(scope='session')
+def plant_cache(request):
+    """Get the file a plant is cached in
+
+    Returns a function that takes the name of the plant, the file of the
+    test module building it, and any other parameters defining it, such as
+    the versions of the simulation software, and returns the path of the
+    HDF5 file the plant is cached in, or None if caching is disabled with
+    --no-plant-cache. The key also depends on the qlance sources and the
+    test module so that plants are recomputed whenever the code computing
+    them or the model itself changes.
+    """
+    use_cache = not request.config.getoption('--no-plant-cache')
+    src_key = source_hash()
+
+    def get_path(name, module_file, *params):
+        if not use_cache:
+            return None
+        sha = hashlib.sha1(src_key.encode())
+        with open(module_file, 'rb') as src:
+            sha.update(src.read())
+        sha.update(repr(params).encode())
+        key = sha.hexdigest()[:12]
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        return os.path.join(CACHE_DIR, '{:s}_{:s}.hdf5'.format(name, key))
+
+    return get_path
+
+
+@pytest.fixture(scope='session')
+def save_cached_plant():
+    """Save a plant to the cache
+
+    Returns a function that takes the plant and the path from plant_cache.
+    The plant is saved to a temporary file first and then moved into place
+    so that an interrupted run, or several running at once, never leave a
+    partially written plant in the cache.
+    """
+    def save(plant, fname):
+        fd, tmp_fname = tempfile.mkstemp(
+            suffix='.hdf5', dir=os.path.dirname(fname))
+        os.close(fd)
+        try:
+            plant.save(tmp_fname)
+            os.replace(tmp_fname, fname)
+        except BaseException:
+            os.remove(tmp_fname)
+            raise
+
+    return save
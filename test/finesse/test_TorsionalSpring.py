@@ -30,54 +30,72 @@ f0 = 1
 Q = 100
 poles = np.array(ctrl.resRoots(2*np.pi*f0, Q, Hz=False))
 
-kat = pykat.finesse.kat()
-
-# make the cavity
-fin.addMirror(kat, 'EX', Chr=1/Re)
-fin.addMirror(kat, 'IX', Thr=Ti, Chr=1/Ri)
-fin.addSpace(kat, 'IX_fr', 'EX_fr', Lcav)
-fin.setCavityBasis(kat, 'IX_fr', 'EX_fr')
-
-# set the pitch response
-fin.setMechTF(kat, 'EX', [], poles, 1/I, doftype='pitch')
-fin.setMechTF(kat, 'IX', [], poles, 1/I, doftype='pitch')
-
-# add input
-fin.addLaser(kat, 'Laser', Pin)
-fin.addModulator(kat, 'Mod', fmod, gmod, 1, 'pm')
-fin.addSpace(kat, 'Laser_out', 'Mod_in', 0)
-fin.addSpace(kat, 'Mod_out', 'IX_bk', 0)
-
-# add DC and RF photodiodes
-fin.addReadout(kat, 'REFL', 'IX_bk', fmod, 0, doftype='pitch')
-
-fin.monitorMotion(kat, 'EX', doftype='pitch')
-fin.monitorMotion(kat, 'IX', doftype='pitch')
-
-fin.monitorBeamSpotMotion(kat, 'EX_fr')
-fin.monitorBeamSpotMotion(kat, 'IX_fr')
-
-kat.phase = 2
-kat.maxtem = 1
-
-katTF = fin.KatFR(kat)
-
 HARD = {'IX': -1, 'EX': r}
 SOFT = {'IX': r, 'EX': 1}
 
 fmin = 1e-1
 fmax = 30
 npts = 1000
-katTF.run(fmin, fmax, npts, doftype='pitch')
-katTF.runDC()
-
-katTF.save('test_torsional_spring.hdf5')
-katTF2 = plant.FinessePlant()
-katTF2.load('test_torsional_spring.hdf5')
-os.remove('test_torsional_spring.hdf5')
 
 
-def test_REFLI_HARD():
+@pytest.fixture(scope='session')
+def katTF(plant_cache, save_cached_plant):
+    kat = pykat.finesse.kat()
+    fname = plant_cache(
+        'finesse_TorsionalSpring', __file__, pykat.__version__,
+        kat.finesse_version(), fmod, gmod, Pin, Ti, Lcav, Ri, Re, I, f0, Q,
+        fmin, fmax, npts)
+    if fname is not None and os.path.exists(fname):
+        katTF = plant.FinessePlant()
+        katTF.load(fname)
+        return katTF
+
+    # make the cavity
+    fin.addMirror(kat, 'EX', Chr=1/Re)
+    fin.addMirror(kat, 'IX', Thr=Ti, Chr=1/Ri)
+    fin.addSpace(kat, 'IX_fr', 'EX_fr', Lcav)
+    fin.setCavityBasis(kat, 'IX_fr', 'EX_fr')
+
+    # set the pitch response
+    fin.setMechTF(kat, 'EX', [], poles, 1/I, doftype='pitch')
+    fin.setMechTF(kat, 'IX', [], poles, 1/I, doftype='pitch')
+
+    # add input
+    fin.addLaser(kat, 'Laser', Pin)
+    fin.addModulator(kat, 'Mod', fmod, gmod, 1, 'pm')
+    fin.addSpace(kat, 'Laser_out', 'Mod_in', 0)
+    fin.addSpace(kat, 'Mod_out', 'IX_bk', 0)
+
+    # add DC and RF photodiodes
+    fin.addReadout(kat, 'REFL', 'IX_bk', fmod, 0, doftype='pitch')
+
+    fin.monitorMotion(kat, 'EX', doftype='pitch')
+    fin.monitorMotion(kat, 'IX', doftype='pitch')
+
+    fin.monitorBeamSpotMotion(kat, 'EX_fr')
+    fin.monitorBeamSpotMotion(kat, 'IX_fr')
+
+    kat.phase = 2
+    kat.maxtem = 1
+
+    katTF = fin.KatFR(kat)
+    katTF.run(fmin, fmax, npts, doftype='pitch')
+    katTF.runDC()
+    if fname is not None:
+        save_cached_plant(katTF, fname)
+    return katTF
+
+
+@pytest.fixture(scope='session')
+def katTF2(katTF, tmp_path_factory):
+    path = tmp_path_factory.mktemp('plants') / 'test_torsional_spring.hdf5'
+    katTF.save(str(path))
+    katTF2 = plant.FinessePlant()
+    katTF2.load(str(path))
+    return katTF2
+
+
+def test_REFLI_HARD(katTF):
     hard = ctrl.DegreeOfFreedom(HARD, 'pitch')
     hard2 = ctrl.DegreeOfFreedom(HARD, 'pitch', probes='REFL_I')
     tf1 = katTF.getTF('REFL_I', HARD, doftype='pitch')
@@ -90,32 +108,32 @@ def test_REFLI_HARD():
     assert np.all([c1, c2, c3])
 
 
-def test_REFLI_SOFT():
+def test_REFLI_SOFT(katTF):
     tf = katTF.getTF('REFL_I', SOFT, doftype='pitch')
     ref = data['tf_REFLI_SOFT']
     assert close.allclose(tf, ref)
 
 
-def test_mech_HARD():
+def test_mech_HARD(katTF):
     tf = katTF.getMechTF(HARD, HARD, doftype='pitch')
     ref = data['mech_HARD']
     assert close.allclose(tf, ref)
 
 
-def test_mech_HARD2():
+def test_mech_HARD2(katTF):
     hard = ctrl.DegreeOfFreedom(HARD, 'pitch')
     tf = katTF.getMechTF(hard, hard)
     ref = data['mech_HARD']
     assert close.allclose(tf, ref)
 
 
-def test_mech_SOFT():
+def test_mech_SOFT(katTF):
     tf = katTF.getMechTF(SOFT, SOFT, doftype='pitch')
     ref = data['mech_SOFT']
     assert close.allclose(tf, ref)
 
 
-def test_mech_SOFT2():
+def test_mech_SOFT2(katTF):
     soft = ctrl.DegreeOfFreedom(SOFT, 'pitch')
     tf1 = katTF.getMechTF(SOFT, soft, doftype='pitch')
     tf2 = katTF.getMechTF(soft, SOFT, doftype='pitch')
@@ -125,13 +143,13 @@ def test_mech_SOFT2():
     assert np.all([c1, c2])
 
 
-def test_mMech_EX_EX():
+def test_mMech_EX_EX(katTF):
     mMech = katTF.getMechMod('EX', 'EX', doftype='pitch')
     ref = data['mMech_EX_EX']
     assert close.allclose(mMech, ref)
 
 
-def test_mMech_EX_EX2():
+def test_mMech_EX_EX2(katTF):
     ex = ctrl.DegreeOfFreedom('EX', doftype='pitch')
     mMech1 = katTF.getMechMod('EX', ex, doftype='pitch')
     mMech2 = katTF.getMechMod(ex, 'EX', doftype='pitch')
@@ -145,13 +163,13 @@ def test_mMech_EX_EX2():
     assert np.all([c1, c2, c3, c4])
 
 
-def test_mMech_IX_EX():
+def test_mMech_IX_EX(katTF):
     mMech = katTF.getMechMod('IX', 'EX', doftype='pitch')
     ref = data['mMech_IX_EX']
     assert close.allclose(mMech, ref)
 
 
-def test_mMech_IX_EX2():
+def test_mMech_IX_EX2(katTF):
     ex = ctrl.DegreeOfFreedom('EX', 'pitch')
     ix = ctrl.DegreeOfFreedom('IX', 'pitch')
     mMech = katTF.getMechMod(ix, ex)
@@ -159,13 +177,13 @@ def test_mMech_IX_EX2():
     assert close.allclose(mMech, ref)
 
 
-def test_bsm_EX_IX():
+def test_bsm_EX_IX(katTF):
     bsm = katTF.computeBeamSpotMotion('EX_fr', 'IX', 'pitch')
     ref = data['bsm_EX_IX']
     assert close.allclose(bsm, ref)
 
 
-def test_bsm_EX_EX():
+def test_bsm_EX_EX(katTF):
     bsm = katTF.computeBeamSpotMotion('EX_fr', 'EX', 'pitch')
     ref = data['bsm_EX_EX']
     assert close.allclose(bsm, ref)
@@ -175,49 +193,49 @@ def test_bsm_EX_EX():
 # test reloaded plants
 ##############################################################################
 
-def test_load_REFLI_HARD():
+def test_load_REFLI_HARD(katTF2):
     tf = katTF2.getTF('REFL_I', HARD, doftype='pitch')
     ref = data['tf_REFLI_HARD']
     assert close.allclose(tf, ref)
 
 
-def test_load_REFLI_SOFT():
+def test_load_REFLI_SOFT(katTF2):
     tf = katTF2.getTF('REFL_I', SOFT, doftype='pitch')
     ref = data['tf_REFLI_SOFT']
     assert close.allclose(tf, ref)
 
 
-def test_load_mech_HARD():
+def test_load_mech_HARD(katTF2):
     tf = katTF2.getMechTF(HARD, HARD, doftype='pitch')
     ref = data['mech_HARD']
     assert close.allclose(tf, ref)
 
 
-def test_load_mech_SOFT():
+def test_load_mech_SOFT(katTF2):
     tf = katTF2.getMechTF(SOFT, SOFT, doftype='pitch')
     ref = data['mech_SOFT']
     assert close.allclose(tf, ref)
 
 
-def test_load_mMech_EX_EX():
+def test_load_mMech_EX_EX(katTF2):
     mMech = katTF2.getMechMod('EX', 'EX', doftype='pitch')
     ref = data['mMech_EX_EX']
     assert close.allclose(mMech, ref)
 
 
-def test_load_mMech_IX_EX():
+def test_load_mMech_IX_EX(katTF2):
     mMech = katTF2.getMechMod('IX', 'EX', doftype='pitch')
     ref = data['mMech_IX_EX']
     assert close.allclose(mMech, ref)
 
 
-def test_load_bsm_EX_IX():
+def test_load_bsm_EX_IX(katTF2):
     bsm = katTF2.computeBeamSpotMotion('EX_fr', 'IX', 'pitch')
     ref = data['bsm_EX_IX']
     assert close.allclose(bsm, ref)
 
 
-def test_load_bsm_EX_EX():
+def test_load_bsm_EX_EX(katTF2):
     bsm = katTF2.computeBeamSpotMotion('EX_fr', 'EX', 'pitch')
     ref = data['bsm_EX_EX']
     assert close.allclose(bsm, ref)
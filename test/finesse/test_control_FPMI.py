@@ -323,3 +323,11 @@ def test_residuals2():
     res1 = cs.getTotalNoiseTo('EX.pos', 'pos', 'drive', seismic_noise)
     res2 = cs.getTotalNoiseTo(EX_dof, 'pos', 'drive', seismic_noise)
     assert close.allclose(res1, res2)
+
+
+def test_getTF_copy():
+    tf1 = cs.getTF('DARM', 'err', 'AS_Q', 'sens')
+    ref = tf1.copy()
+    tf1 *= 0
+    tf2 = cs.getTF('DARM', 'err', 'AS_Q', 'sens')
+    assert close.allclose(tf2, ref)
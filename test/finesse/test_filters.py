@@ -144,3 +144,28 @@ class TestFilters:
         zpk1 = self.filt2a.get_zpk()
         zpk2 = self.filt2r.get_zpk()
         assert np.all(check_zpk_equality(zpk1, zpk2))
+
+    def test_zpk_long(self):
+        zs, ps, k = self.filt3a.get_zpk()
+        ss = 2j*np.pi*self.ff
+        data1 = ctrl.zpk(zs, ps, k, ss)
+        data2 = np.array([ctrl.zpk(zs, ps, k, si) for si in ss])
+        assert close.allclose(data1, data2)
+
+    def test_cat4(self):
+        k2 = self.k2
+        p2 = self.p2
+        filt2b = ctrl.Filter(
+            lambda ss: k2/((ss + 2*np.pi*p2[0])*(ss + 2*np.pi*p2[1])))
+        filt3e = ctrl.catfilt(self.filt1a, filt2b, self.filt4)
+        data1 = self.filt3a.computeFilter(self.ff)
+        data1 *= self.filt4.computeFilter(self.ff)
+        data2 = filt3e.computeFilter(self.ff)
+        assert close.allclose(data1, data2)
+
+    def test_cat_empty(self):
+        filt = ctrl.catfilt()
+        zs, ps, k = filt.get_zpk()
+        assert len(zs) == 0 and len(ps) == 0 and k == 1
+        data = filt.computeFilter(self.ff)
+        assert close.allclose(data, np.ones_like(self.ff))
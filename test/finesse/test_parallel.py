@@ -0,0 +1,91 @@
+"""
+Unit tests for computing finesse frequency responses in parallel
+"""
+
+import numpy as np
+import qlance.finesse as fin
+import pykat
+import zlib
+import pytest
+
+pytest.importorskip('joblib')
+
+fmod = 11e3
+gmod = 0.1
+Pin = 1
+Ti = 0.01
+Lcav = 40e3
+npts = 100
+
+
+def katFP():
+    kat = pykat.finesse.kat()
+
+    fin.addMirror(kat, 'EX', Thr=0)
+    fin.addMirror(kat, 'IX', Thr=Ti)
+    fin.addSpace(kat, 'IX_fr', 'EX_fr', Lcav)
+
+    for optic in ['EX', 'IX']:
+        fin.setMechTF(kat, optic, [], [0, 0], 1)
+
+    fin.addLaser(kat, 'Laser', Pin)
+    fin.addModulator(kat, 'Mod', fmod, gmod, 5, 'pm')
+    fin.addSpace(kat, 'Laser_out', 'Mod_in', 0)
+    fin.addSpace(kat, 'Mod_out', 'IX_bk', 0)
+
+    fin.addReadout(kat, 'REFL', 'IX_bk', fmod, 0)
+    fin.monitorMotion(kat, 'EX')
+    fin.monitorMotion(kat, 'IX')
+
+    kat.phase = 2
+
+    return kat
+
+
+class FakeOutput:
+    """Output of a finesse run that depends only on the generated script
+    """
+    def __init__(self, kat):
+        # skip the comments since they include the time the script was made
+        script = ''.join(line for line in kat.generateKatScript()
+                         if not line.startswith('%'))
+        self._seed = zlib.crc32(script.encode())
+        self.x = np.geomspace(1e-2, 1e4, npts)
+
+    def __getitem__(self, name):
+        rng = np.random.default_rng([self._seed, zlib.crc32(name.encode())])
+        return rng.normal(size=npts) + 1j*rng.normal(size=npts)
+
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    monkeypatch.setattr(
+        pykat.finesse.kat, 'run', lambda kat, *args, **kwargs: FakeOutput(kat))
+
+
+@pytest.mark.parametrize('as_generator', [True, False])
+def test_parallel(fake_run, monkeypatch, as_generator):
+    # joblib older than 1.3 can't return the results as a generator
+    if not as_generator:
+        monkeypatch.setattr(fin, '_parallel_kwargs', {})
+    katFR1 = fin.KatFR(katFP())
+    katFR1.run(1e-2, 1e4, npts, verbose=0)
+    katFR2 = fin.KatFR(katFP())
+    katFR2.run(1e-2, 1e4, npts, verbose=0, n_jobs=2)
+
+    drives = [drive for drive in katFR1.drives
+              if fin.has_dof(katFR1.kat, drive, 'pos')]
+    assert len(drives) > 1
+    for probe in katFR1.probes:
+        for drive in drives:
+            tf1 = katFR1.getTF(probe, drive)
+            tf2 = katFR2.getTF(probe, drive)
+            assert np.array_equal(tf1, tf2)
+
+    for drive_out in ['EX', 'IX']:
+        for drive_in in drives:
+            mMech1 = katFR1.getMechMod(drive_out, drive_in)
+            mMech2 = katFR2.getMechMod(drive_out, drive_in)
+            assert np.array_equal(mMech1, mMech2)
+
+    assert np.array_equal(katFR1.ff, katFR2.ff)
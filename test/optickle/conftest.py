@@ -0,0 +1,38 @@
+"""
+Shared fixtures for the optickle tests
+"""
+
+import os
+import subprocess
+import pytest
+
+
+@pytest.fixture(scope='session')
+def eng():
+    """A MATLAB engine with Optickle on the path shared by all tests
+
+    The tests using it are skipped if the MATLAB engine isn't installed.
+    """
+    matlab_engine = pytest.importorskip('matlab.engine')
+    import qlance.optickle as pyt
+    eng = matlab_engine.start_matlab()
+    pyt.addOpticklePath(eng)
+    yield eng
+    eng.quit()
+
+
+@pytest.fixture(scope='session')
+def optickle_sha():
+    """The commit SHA of the Optickle on OPTICKLE_PATH
+
+    This is found without starting MATLAB so that it can be used to check
+    whether cached plants are up to date.
+    """
+    gitdir = os.path.join(os.environ.get('OPTICKLE_PATH', ''), '.git')
+    try:
+        gitsha = subprocess.check_output(
+            ['git', '--git-dir=' + gitdir, 'rev-parse', 'HEAD'],
+            stderr=subprocess.DEVNULL)
+        return str(gitsha, 'utf-8').rstrip()
+    except (OSError, subprocess.CalledProcessError):
+        return '???'
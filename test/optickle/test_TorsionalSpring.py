@@ -2,18 +2,13 @@
 Unit tests for optickle torsional spring
 """
 
-import matlab.engine
 import numpy as np
-import qlance.optickle as pyt
 import qlance.controls as ctrl
 import qlance.plant as plant
 import os
 import close
 import pytest
 
-eng = matlab.engine.start_matlab()
-pyt.addOpticklePath(eng)
-
 data = np.load('data/optickle_TorsionalSpring_data.npz')
 
 fmod = 11e3
@@ -35,53 +30,75 @@ poles = np.array(ctrl.resRoots(2*np.pi*f0, Q, Hz=False))
 
 vRF = np.array([-fmod, 0, fmod])
 
-opt = pyt.Optickle(eng, 'opt', vRF)
-# opt = pyt.Optickle(eng, 'opt')
-
-# make the cavity
-opt.addMirror('EX', Chr=1/Re)
-opt.addMirror('IX', Thr=Ti, Chr=1/Ri)
-opt.addLink('IX', 'fr', 'EX', 'fr', Lcav)
-opt.addLink('EX', 'fr', 'IX', 'fr', Lcav)
-opt.setCavityBasis('IX', 'EX')
-
-# set the pitch response
-opt.setMechTF('EX', [], poles, 1/I, doftype='pitch')
-opt.setMechTF('IX', [], poles, 1/I, doftype='pitch')
-
-# add input
-opt.addSource('Laser', np.sqrt(Pin)*(vRF == 0))
-# opt.addSource('Laser', np.sqrt(Pin))
-opt.addRFmodulator('Mod', fmod, 1j*gmod)  # RF modulator for PDH sensing
-opt.addLink('Laser', 'out', 'Mod', 'in', 0)
-opt.addLink('Mod', 'out', 'IX', 'bk', 0)
-# opt.addLink('Laser', 'out', 'IX', 'bk', 0)
-
-# add DC and RF photodiodes
-opt.addSink('REFL')
-opt.addLink('IX', 'bk', 'REFL', 'in', 0)
-opt.addReadout('REFL', fmod, 0)
-
-opt.monitorBeamSpotMotion('EX', 'fr')
-opt.monitorBeamSpotMotion('IX', 'fr')
-
-
 HARD = {'IX': -1, 'EX': r}
 SOFT = {'IX': r, 'EX': 1}
 
 fmin = 1e-1
 fmax = 30
 npts = 1000
-ff = np.logspace(np.log10(fmin), np.log10(fmax), npts)
-opt.run(ff, doftype='pitch', noise=False)
-
-opt.save('test_torsional_spring.hdf5')
-opt2 = plant.OpticklePlant()
-opt2.load('test_torsional_spring.hdf5')
-os.remove('test_torsional_spring.hdf5')
-
-
-def test_REFLI_HARD():
+ff = np.geomspace(fmin, fmax, npts)
+
+
+@pytest.fixture(scope='session')
+def opt(plant_cache, save_cached_plant, optickle_sha, request):
+    fname = plant_cache(
+        'optickle_TorsionalSpring', __file__, optickle_sha, fmod, gmod, Pin,
+        Ti, Lcav, Ri, Re, I, f0, Q, fmin, fmax, npts)
+    if fname is not None and os.path.exists(fname):
+        opt = plant.OpticklePlant()
+        opt.load(fname)
+        return opt
+
+    # only start MATLAB if the plant needs to be computed. qlance.optickle
+    # needs MATLAB so only import it here too
+    eng = request.getfixturevalue('eng')
+    import qlance.optickle as pyt
+    opt = pyt.Optickle(eng, 'opt', vRF)
+    # opt = pyt.Optickle(eng, 'opt')
+
+    # make the cavity
+    opt.addMirror('EX', Chr=1/Re)
+    opt.addMirror('IX', Thr=Ti, Chr=1/Ri)
+    opt.addLink('IX', 'fr', 'EX', 'fr', Lcav)
+    opt.addLink('EX', 'fr', 'IX', 'fr', Lcav)
+    opt.setCavityBasis('IX', 'EX')
+
+    # set the pitch response
+    opt.setMechTF('EX', [], poles, 1/I, doftype='pitch')
+    opt.setMechTF('IX', [], poles, 1/I, doftype='pitch')
+
+    # add input
+    opt.addSource('Laser', np.sqrt(Pin)*(vRF == 0))
+    # opt.addSource('Laser', np.sqrt(Pin))
+    opt.addRFmodulator('Mod', fmod, 1j*gmod)  # RF modulator for PDH sensing
+    opt.addLink('Laser', 'out', 'Mod', 'in', 0)
+    opt.addLink('Mod', 'out', 'IX', 'bk', 0)
+    # opt.addLink('Laser', 'out', 'IX', 'bk', 0)
+
+    # add DC and RF photodiodes
+    opt.addSink('REFL')
+    opt.addLink('IX', 'bk', 'REFL', 'in', 0)
+    opt.addReadout('REFL', fmod, 0)
+
+    opt.monitorBeamSpotMotion('EX', 'fr')
+    opt.monitorBeamSpotMotion('IX', 'fr')
+
+    opt.run(ff, doftype='pitch', noise=False)
+    if fname is not None:
+        save_cached_plant(opt, fname)
+    return opt
+
+
+@pytest.fixture(scope='session')
+def opt2(opt, tmp_path_factory):
+    path = tmp_path_factory.mktemp('plants') / 'test_torsional_spring.hdf5'
+    opt.save(str(path))
+    opt2 = plant.OpticklePlant()
+    opt2.load(str(path))
+    return opt2
+
+
+def test_REFLI_HARD(opt):
     hard = ctrl.DegreeOfFreedom(HARD, 'pitch')
     hard2 = ctrl.DegreeOfFreedom(HARD, 'pitch', probes='REFL_I')
     tf1 = opt.getTF('REFL_I', HARD, doftype='pitch')
@@ -94,32 +111,32 @@ def test_REFLI_HARD():
     assert np.all([c1, c2, c3])
 
 
-def test_REFLI_SOFT():
+def test_REFLI_SOFT(opt):
     tf = opt.getTF('REFL_I', SOFT, doftype='pitch')
     ref = data['tf_REFLI_SOFT']
     assert close.allclose(tf, ref)
 
 
-def test_mech_HARD():
+def test_mech_HARD(opt):
     tf = opt.getMechTF(HARD, HARD, doftype='pitch')
     ref = data['mech_HARD']
     assert close.allclose(tf, ref)
 
 
-def test_mech_HARD2():
+def test_mech_HARD2(opt):
     hard = ctrl.DegreeOfFreedom(HARD, 'pitch')
     tf = opt.getMechTF(hard, hard)
     ref = data['mech_HARD']
     assert close.allclose(tf, ref)
 
 
-def test_mech_SOFT():
+def test_mech_SOFT(opt):
     tf = opt.getMechTF(SOFT, SOFT, doftype='pitch')
     ref = data['mech_SOFT']
     assert close.allclose(tf, ref)
 
 
-def test_mech_SOFT2():
+def test_mech_SOFT2(opt):
     soft = ctrl.DegreeOfFreedom(SOFT, 'pitch')
     tf1 = opt.getMechTF(SOFT, soft, doftype='pitch')
     tf2 = opt.getMechTF(soft, SOFT, doftype='pitch')
@@ -129,13 +146,13 @@ def test_mech_SOFT2():
     assert np.all([c1, c2])
 
 
-def test_mMech_EX_EX():
+def test_mMech_EX_EX(opt):
     mMech = opt.getMechMod('EX', 'EX', doftype='pitch')
     ref = data['mMech_EX_EX']
     assert close.allclose(mMech, ref)
 
 
-def test_mMech_EX_EX2():
+def test_mMech_EX_EX2(opt):
     ex = ctrl.DegreeOfFreedom('EX', doftype='pitch')
     mMech1 = opt.getMechMod('EX', ex, doftype='pitch')
     mMech2 = opt.getMechMod(ex, 'EX', doftype='pitch')
@@ -149,13 +166,13 @@ def test_mMech_EX_EX2():
     assert np.all([c1, c2, c3, c4])
 
 
-def test_mMech_IX_EX():
+def test_mMech_IX_EX(opt):
     mMech = opt.getMechMod('IX', 'EX', doftype='pitch')
     ref = data['mMech_IX_EX']
     assert close.allclose(mMech, ref)
 
 
-def test_mMech_IX_EX2():
+def test_mMech_IX_EX2(opt):
     ex = ctrl.DegreeOfFreedom('EX', 'pitch')
     ix = ctrl.DegreeOfFreedom('IX', 'pitch')
     mMech = opt.getMechMod(ix, ex)
@@ -163,13 +180,13 @@ def test_mMech_IX_EX2():
     assert close.allclose(mMech, ref)
 
 
-def test_bsm_EX_IX():
+def test_bsm_EX_IX(opt):
     bsm = opt.computeBeamSpotMotion('EX', 'fr', 'IX', 'pitch')
     ref = data['bsm_EX_IX']
     assert close.allclose(bsm, ref)
 
 
-def test_bsm_EX_EX():
+def test_bsm_EX_EX(opt):
     bsm = opt.computeBeamSpotMotion('EX', 'fr', 'EX', 'pitch')
     ref = data['bsm_EX_EX']
     assert close.allclose(bsm, ref)
@@ -179,49 +196,49 @@ def test_bsm_EX_EX():
 # test reloaded plants
 ##############################################################################
 
-def test_load_REFLI_HARD():
+def test_load_REFLI_HARD(opt2):
     tf = opt2.getTF('REFL_I', HARD, doftype='pitch')
     ref = data['tf_REFLI_HARD']
     assert close.allclose(tf, ref)
 
 
-def test_load_REFLI_SOFT():
+def test_load_REFLI_SOFT(opt2):
     tf = opt2.getTF('REFL_I', SOFT, doftype='pitch')
     ref = data['tf_REFLI_SOFT']
     assert close.allclose(tf, ref)
 
 
-def test_load_mech_HARD():
+def test_load_mech_HARD(opt2):
     tf = opt2.getMechTF(HARD, HARD, doftype='pitch')
     ref = data['mech_HARD']
     assert close.allclose(tf, ref)
 
 
-def test_load_mech_SOFT():
+def test_load_mech_SOFT(opt2):
     tf = opt2.getMechTF(SOFT, SOFT, doftype='pitch')
     ref = data['mech_SOFT']
     assert close.allclose(tf, ref)
 
 
-def test_load_mMech_EX_EX():
+def test_load_mMech_EX_EX(opt2):
     mMech = opt2.getMechMod('EX', 'EX', doftype='pitch')
     ref = data['mMech_EX_EX']
     assert close.allclose(mMech, ref)
 
 
-def test_load_mMech_IX_EX():
+def test_load_mMech_IX_EX(opt2):
     mMech = opt2.getMechMod('IX', 'EX', doftype='pitch')
     ref = data['mMech_IX_EX']
     assert close.allclose(mMech, ref)
 
 
-def test_load_bsm_EX_IX():
+def test_load_bsm_EX_IX(opt2):
     bsm = opt2.computeBeamSpotMotion('EX', 'fr', 'IX', 'pitch')
     ref = data['bsm_EX_IX']
     assert close.allclose(bsm, ref)
 
 
-def test_load_bsm_EX_EX():
+def test_load_bsm_EX_EX(opt2):
     bsm = opt2.computeBeamSpotMotion('EX', 'fr', 'EX', 'pitch')
     ref = data['bsm_EX_EX']
     assert close.allclose(bsm, ref)